@@ -0,0 +1,78 @@
+import json
+import os
+import shutil
+import sqlite3
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+from filelock import FileLock
+
+from video_server.app_state import AppState
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TMP_DIR = os.path.join(HERE, "test_data", "tmp", "app_state")
+STATE_FILE = os.path.join(TMP_DIR, "app_state.json")
+LEGACY_DB = os.path.join(TMP_DIR, "app.sqlite")
+LOCK_FILE = os.path.join(TMP_DIR, "startup.lock")
+STATE = {"views": 3, "magnetURI": "magnet:?xt=urn:btih:1234"}
+
+
+def make_legacy_db() -> None:
+    """Writes STATE into a keyvalue_sqlite style table."""
+    conn = sqlite3.connect(LEGACY_DB)
+    conn.execute("CREATE TABLE app (key TEXT PRIMARY KEY UNIQUE NOT NULL, value TEXT);")
+    conn.executemany(
+        "INSERT INTO app VALUES (?, ?)",
+        [(key, json.dumps(val)) for key, val in STATE.items()],
+    )
+    conn.commit()
+    conn.close()
+
+
+def load_with_lock(_: int) -> dict:
+    """Loads the state the way each server worker does."""
+    return AppState(STATE_FILE, legacy_db=LEGACY_DB, lock=FileLock(LOCK_FILE)).to_dict()
+
+
+class AppStateTester(unittest.TestCase):
+    """Tester for the app state."""
+
+    def setUp(self) -> None:
+        shutil.rmtree(TMP_DIR, ignore_errors=True)
+        os.makedirs(TMP_DIR, exist_ok=True)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+    def test_missing_file(self) -> None:
+        """A missing state file gives an empty state."""
+        self.assertEqual({}, AppState(STATE_FILE).to_dict())
+        self.assertEqual({}, AppState(STATE_FILE, legacy_db=LEGACY_DB).to_dict())
+        self.assertFalse(os.path.exists(STATE_FILE))
+
+    def test_corrupt_file(self) -> None:
+        """Unparsable json or a json value that isn't an object is ignored."""
+        for contents in ["{not json", "[1, 2]", "42"]:
+            with open(STATE_FILE, encoding="utf-8", mode="w") as filed:
+                filed.write(contents)
+            self.assertEqual({}, AppState(STATE_FILE).to_dict())
+
+    def test_round_trip(self) -> None:
+        """State migrated from the legacy database is saved and loaded back."""
+        make_legacy_db()
+        self.assertEqual(STATE, AppState(STATE_FILE, legacy_db=LEGACY_DB).to_dict())
+        os.remove(LEGACY_DB)
+        self.assertEqual(STATE, AppState(STATE_FILE).to_dict())
+
+    def test_concurrent_migrations(self) -> None:
+        """Workers starting at the same time all migrate without errors."""
+        make_legacy_db()
+        with ProcessPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(load_with_lock, range(32)))
+        self.assertEqual([STATE] * 32, results)
+        self.assertEqual([], [f for f in os.listdir(TMP_DIR) if f.endswith(".tmp")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+
+from video_server.io import sanitize_path
+
+
+class SanitizePathTester(unittest.TestCase):
+    """Pins sanitize_path to the names existing video directories use."""
+
+    def test_clean_names(self) -> None:
+        """Names that are already clean are returned as is."""
+        self.assertEqual("Hello_World", sanitize_path("Hello_World"))
+        self.assertEqual("a" * 255, sanitize_path("a" * 255))
+
+    def test_specials(self) -> None:
+        """Special characters become single underscores."""
+        self.assertEqual("Hello_World_2022", sanitize_path("Hello World (2022)"))
+        self.assertEqual("My_Movie", sanitize_path("My--Movie!!"))
+        self.assertEqual("Le_Film_mp4", sanitize_path("Le Film.mp4"))
+        self.assertEqual("_init", sanitize_path("__init__"))
+        self.assertEqual("", sanitize_path("   "))
+
+    def test_trailing_underscores(self) -> None:
+        """Trailing underscores are stripped, but never below 4 chars."""
+        self.assertEqual("abcdef", sanitize_path("abcdef___"))
+        self.assertEqual("abc_", sanitize_path("abc_____"))
+        self.assertEqual("ab__", sanitize_path("ab______"))
+
+    def test_short_names(self) -> None:
+        """Collapsing underscores stops once the name is 4 chars."""
+        self.assertEqual("a__b", sanitize_path("a____b"))
+        self.assertEqual("a__b", sanitize_path("a__b"))
+
+    def test_reserved_names(self) -> None:
+        """Reserved names keep the suffix pathvalidate adds."""
+        self.assertEqual("CON_", sanitize_path("CON"))
+        self.assertEqual("CON_1", sanitize_path("CON_1"))
+        self.assertEqual("LPT1", sanitize_path("LPT1_"))
+        self.assertEqual("con_txt", sanitize_path("con.txt"))
+
+    def test_long_names(self) -> None:
+        """Names over 255 chars skip the fast path and are truncated to 260."""
+        self.assertEqual("x" * 256, sanitize_path("x" * 256))
+        self.assertEqual("x" * 250 + "_" + "y" * 9, sanitize_path("x" * 250 + "_" + "y" * 50))
+        self.assertEqual("x" * 260, sanitize_path("x" * 300))
+
+    def test_non_ascii(self) -> None:
+        """Non ascii letters are kept."""
+        self.assertEqual("Señor_Película_Día", sanitize_path("Señor Película: Día"))
+        self.assertEqual("日本語_タイトル", sanitize_path("日本語 タイトル"))
+
+
+if __name__ == "__main__":
+    unittest.main()
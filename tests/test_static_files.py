@@ -0,0 +1,29 @@
+import unittest
+
+from fastapi.testclient import TestClient
+
+from video_server.app import app
+
+
+class StaticFilesTester(unittest.TestCase):
+    """Tester for the cache headers of the /www static files."""
+
+    def test_cache_headers(self) -> None:
+        """Player assets are cached, other files revalidate, errors get nothing."""
+        with TestClient(app) as client:
+            resp = client.get("/www/player/index.js")
+            self.assertEqual(200, resp.status_code)
+            self.assertEqual("public, max-age=3600", resp.headers["cache-control"])
+            resp = client.get("/www/index.html")
+            self.assertEqual(200, resp.status_code)
+            self.assertEqual("no-cache", resp.headers["cache-control"])
+            resp = client.get("/www/index.html", headers={"if-none-match": resp.headers["etag"]})
+            self.assertEqual(304, resp.status_code)
+            self.assertNotIn("cache-control", resp.headers)
+            resp = client.get("/www/missing.html")
+            self.assertEqual(404, resp.status_code)
+            self.assertNotIn("cache-control", resp.headers)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from video_server.app import add_view, flush_pending_views, pending_views
+from video_server.models import Video
+
+
+class ViewsTester(unittest.TestCase):
+    """Tester for the buffered view counts."""
+
+    def setUp(self) -> None:
+        Video.delete().where(Video.title == "views_test").execute()
+        self.video = Video.create(
+            title="views_test", url="http://localhost/v/views_test", path="views_test"
+        )
+        pending_views.clear()
+
+    def tearDown(self) -> None:
+        pending_views.clear()
+        self.video.delete_instance()
+
+    def views(self) -> int:
+        """Returns the views stored in the database."""
+        return Video.get_by_id(self.video.id).views
+
+    def test_flush(self) -> None:
+        """Views are only written to the database on flush."""
+        for _ in range(3):
+            asyncio.run(add_view(self.video.id))
+        self.assertEqual(0, self.views())
+        flush_pending_views()
+        self.assertEqual(3, self.views())
+        self.assertEqual({}, pending_views)
+
+    def test_failed_flush(self) -> None:
+        """A failed flush keeps the counts for the next flush."""
+        asyncio.run(add_view(self.video.id))
+        asyncio.run(add_view(self.video.id))
+        with mock.patch.object(Video, "update", side_effect=RuntimeError("database is locked")):
+            with self.assertRaises(RuntimeError):
+                flush_pending_views()
+        self.assertEqual(0, self.views())
+        self.assertEqual({self.video.id: 2}, pending_views)
+        flush_pending_views()
+        self.assertEqual(2, self.views())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,6 +6,7 @@
 import asyncio
 import datetime
 import hashlib
+import itertools
 import os
 import shutil
 import threading
@@ -13,11 +14,12 @@ import time
 import traceback
 import subprocess
 import json
-import random
 from dataclasses import dataclass
+from pathlib import PurePath
 from tempfile import TemporaryDirectory
-from typing import Optional
+from typing import Any, Optional
 
+import orjson
 import uvicorn  # type: ignore
 import httpx
 from fastapi import BackgroundTasks, FastAPI, File, Request, UploadFile
@@ -34,8 +36,8 @@ from fastapi.staticfiles import StaticFiles
 from filelock import FileLock, Timeout
 from PIL import Image  # type: ignore
 from httpx import AsyncClient
-from keyvalue_sqlite import KeyValueSqlite  # type: ignore
 from starlette.background import BackgroundTask
+from video_server.app_state import AppState
 from video_server.asyncwrap import asyncwrap
 from video_server.db import (
     db_list_all_files,
@@ -50,10 +52,11 @@ from video_server.generate_files import (
     async_create_metadata_files,
 )
 from video_server.log import log
-from video_server.models import Video
+from video_server.models import Video, db_proxy
 from video_server.rss import rss
 from video_server.settings import (  # STUN_SERVERS,; TRACKER_ANNOUNCE_LIST,
     APP_DB,
+    APP_STATE_FILE,
     DATA_ROOT,
     DISABLE_AUTH,
     DOMAIN_NAME,
@@ -95,6 +98,9 @@ from video_server.version import VERSION
 # from starlette.requests import Request
 
 
+PLAYER_FILES_MAX_AGE = 60 * 60  # 1 hour
+
+
 class RssResponse(Response):  # pylint: disable=too-few-public-methods
     """Returns an RSS response from a query."""
 
@@ -102,6 +108,37 @@ class RssResponse(Response):  # pylint: disable=too-few-public-methods
     charset = "utf-8"
 
 
+class OrjsonResponse(JSONResponse):  # pylint: disable=too-few-public-methods
+    """Returns a json response serialized with orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+
+class CachedStaticFiles(StaticFiles):
+    """
+    Static files with cache headers. Only the player assets are cached, the
+    per video files can be rewritten at the same url by a delete and
+    re-upload so clients have to revalidate them.
+    """
+
+    def file_response(
+        self,
+        full_path: "os.PathLike[str] | str",
+        stat_result: os.stat_result,
+        scope: Any,
+        status_code: int = 200,
+    ) -> Response:
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if response.status_code != 200:
+            return response
+        if PurePath(self.get_path(scope)).parts[:1] == ("player",):
+            response.headers["Cache-Control"] = f"public, max-age={PLAYER_FILES_MAX_AGE}"
+        else:
+            response.headers["Cache-Control"] = "no-cache"
+        return response
+
+
 @dataclass
 class VidInfo:
     """Video info to use while processing a video."""
@@ -114,8 +151,15 @@ HTTP_SERVER = AsyncClient(base_url=f"http://localhost:{FILE_PORT}/")
 
 log.info("Starting fastapi webtorrent movie server")
 
-app_state = KeyValueSqlite(APP_DB, "app")
 startup_lock = FileLock(STARTUP_LOCK)
+app_state = AppState(APP_STATE_FILE, legacy_db=APP_DB, lock=startup_lock)
+tmp_file_counter = itertools.count()
+
+# Views are counted in memory and periodically written to the database so
+# that /add_view doesn't do a sqlite write per hit.
+VIEW_FLUSH_INTERVAL = 5
+pending_views: dict[int, int] = {}
+pending_views_lock = threading.Lock()
 
 
 def app_description() -> str:
@@ -149,6 +193,28 @@ app.add_middleware(
 
 STARTUP_DATETIME = datetime.datetime.now()
 
+# Skeleton of the /info response, the None values are filled in per request.
+INFO_TEMPLATE = {
+    "version": VERSION,
+    "Launched at": STARTUP_DATETIME.isoformat(),
+    "Current utc time": None,
+    "Process ID": os.getpid(),
+    "Thread ID": None,
+    "Number of Views": None,
+    "App state": None,
+    "PROJECT_ROOT": PROJECT_ROOT,
+    "DATA_ROOT": DATA_ROOT,
+    "WWW_ROOT": WWW_ROOT,
+    "VIDEO_ROOT": VIDEO_ROOT,
+    "LOGFILE": LOGFILE,
+    "Links": None,
+    "DOMAIN_NAME": DOMAIN_NAME,
+}
+
+# Static responses are immutable so they are built once and reused.
+INDEX_REDIRECT = RedirectResponse(url="/docs", status_code=302)
+FAVICON_REDIRECT = RedirectResponse(url="/www/favicon.ico")
+
 
 def get_current_thread_id() -> int:
     """Return the current thread id."""
@@ -176,6 +242,36 @@ def digest_equals(password, password_compare) -> bool:
     )
 
 
+def flush_pending_views() -> None:
+    """Writes the views counted in memory to the database."""
+    with pending_views_lock:
+        views = dict(pending_views)
+        pending_views.clear()
+    if not views:
+        return
+    try:
+        # One transaction so a flush costs a single commit.
+        with db_proxy.atomic():
+            for vid_id, count in views.items():
+                Video.update(views=Video.views + count).where(Video.id == vid_id).execute()
+    except Exception:
+        # Put the counts back so the next flush retries them.
+        with pending_views_lock:
+            for vid_id, count in views.items():
+                pending_views[vid_id] = pending_views.get(vid_id, 0) + count
+        raise
+
+
+async def flush_pending_views_loop() -> None:
+    """Periodically flushes the pending views to the database."""
+    while True:
+        await asyncio.sleep(VIEW_FLUSH_INTERVAL)
+        try:
+            await asyncio.to_thread(flush_pending_views)
+        except Exception as exc:
+            log.error(f"Error flushing views: {exc}")
+
+
 @app.on_event("startup")
 def startup_event():
     """Event handler for when the app starts up."""
@@ -187,27 +283,35 @@ def startup_event():
         log.error("Startup lock timeout")
 
 
+@app.on_event("startup")
+async def start_view_flusher():
+    """Starts the task that writes the pending views to the database."""
+    app.state.view_flusher = asyncio.create_task(flush_pending_views_loop())
+
+
 @app.on_event("shutdown")
 def shutdown_event():
     """Event handler for when the app shuts down."""
     log.info("Application shutdown")
+    app.state.view_flusher.cancel()
+    flush_pending_views()
 
 
 # Mount all the static files.
-app.mount("/www", StaticFiles(directory=WWW_ROOT, html=True), "www")
+app.mount("/www", CachedStaticFiles(directory=WWW_ROOT, html=True), "www")
 
 
 @app.get("/", include_in_schema=False)
 async def index() -> RedirectResponse:
     """By default redirect to the fastapi docs."""
-    return RedirectResponse(url="/docs", status_code=302)
+    return INDEX_REDIRECT
 
 
 # Redirect to favicon.ico
 @app.get("/favicon.ico", include_in_schema=False)
 async def favicon() -> RedirectResponse:
     """Returns favico file."""
-    return RedirectResponse(url="/www/favicon.ico")
+    return FAVICON_REDIRECT
 
 
 @app.post("/login", tags=["Public"])
@@ -234,29 +338,19 @@ def login(password: str) -> PlainTextResponse:
 
 
 @app.get("/info")
-async def api_info(request: Request) -> JSONResponse:
+async def api_info(request: Request) -> OrjsonResponse:
     """Returns the current time and the number of seconds since the server started."""
     if not is_authorized(request):
-        return JSONResponse({"error": "Not Authorized"}, status_code=401)
+        return OrjsonResponse({"error": "Not Authorized"}, status_code=401)
     app_data = app_state.to_dict()
     links = [get_video_url(video.url) for video in Video.select()]
-    out = {
-        "version": VERSION,
-        "Launched at": str(STARTUP_DATETIME),
-        "Current utc time": str(datetime.datetime.utcnow()),
-        "Process ID": os.getpid(),
-        "Thread ID": get_current_thread_id(),
-        "Number of Views": app_data.get("views", 0),
-        "App state": app_data,
-        "PROJECT_ROOT": PROJECT_ROOT,
-        "DATA_ROOT": DATA_ROOT,
-        "WWW_ROOT": WWW_ROOT,
-        "VIDEO_ROOT": VIDEO_ROOT,
-        "LOGFILE": LOGFILE,
-        "Links": links,
-        "DOMAIN_NAME": DOMAIN_NAME,
-    }
-    return JSONResponse(out)
+    out = INFO_TEMPLATE.copy()
+    out["Current utc time"] = datetime.datetime.utcnow()
+    out["Thread ID"] = get_current_thread_id()
+    out["Number of Views"] = app_data.get("views", 0)
+    out["App state"] = app_data
+    out["Links"] = links
+    return OrjsonResponse(out)
 
 
 @app.get("/videos")
@@ -271,11 +365,9 @@ async def add_view(
     id: int,  # pylint: disable=redefined-builtin,invalid-name
 ) -> PlainTextResponse:
     """Adds a view to the app state."""
-    try:
-        Video.update(views=Video.views + 1).where(Video.id == id).execute()
-        return PlainTextResponse("View added")
-    except Exception as exc:
-        return PlainTextResponse(f"Error adding view because {exc}")
+    with pending_views_lock:
+        pending_views[id] = pending_views.get(id, 0) + 1
+    return PlainTextResponse("View added")
 
 
 @app.get("/rss")
@@ -285,21 +377,21 @@ async def rss_feed() -> RssResponse:
 
 
 @app.get("/json")
-async def json_feed() -> JSONResponse:
+async def json_feed() -> OrjsonResponse:
     """Returns an RSS feed of the videos."""
     out = []
     for video in Video.select():
         out.append(video.asjson())
-    return JSONResponse(out)
+    return OrjsonResponse(out)
 
 
 @app.get("/list_all_files")
-def list_all_files(request: Request) -> JSONResponse:
+def list_all_files(request: Request) -> OrjsonResponse:
     """List all files in a directory."""
     if not is_authorized(request):
-        return JSONResponse({"error": "Not Authorized"}, status_code=401)
+        return OrjsonResponse({"error": "Not Authorized"}, status_code=401)
     urls = [path_to_url(file) for file in db_list_all_files()]
-    return JSONResponse(urls)
+    return OrjsonResponse(urls)
 
 
 @app.post("/upload")
@@ -356,21 +448,23 @@ async def upload(  # pylint: disable=too-many-branches,too-many-arguments,too-ma
         )
     subtitle_dir = os.path.join(video_dir, "subtitles")
     # final_path = os.path.join(video_dir, "vid.mp4")
-    with TemporaryDirectory() as temp_dir:
-        temp_path: str = os.path.join(temp_dir, "vid.mp4")
-        await async_download(file, temp_path)
-        height = await async_get_video_height(temp_path)
-        final_path: str = os.path.join(video_dir, f"{height}.mp4")
-        shutil.move(temp_path, final_path)
+    # Download next to the final location so that the rename is atomic and
+    # never falls back to copying the whole video across filesystems.
+    temp_path: str = os.path.join(video_dir, "tmp_vid.mp4")
+    await async_download(file, temp_path)
+    height = await async_get_video_height(temp_path)
+    final_path: str = os.path.join(video_dir, f"{height}.mp4")
+    os.replace(temp_path, final_path)
 
     if subtitles_zip is not None:
         log.info(f"Uploading subtitles: {subtitles_zip.filename}")
-        await async_download(subtitles_zip, os.path.join(video_dir, "subtitles.zip"))
+        subtitles_zip_path = os.path.join(video_dir, "subtitles.zip")
+        await async_download(subtitles_zip, subtitles_zip_path)
 
         @asyncwrap
         def async_unpack_subtitles():
-            shutil.unpack_archive(os.path.join(video_dir, "subtitles.zip"), subtitle_dir)
-            os.remove(os.path.join(video_dir, "subtitles.zip"))
+            shutil.unpack_archive(subtitles_zip_path, subtitle_dir)
+            os.remove(subtitles_zip_path)
 
         await async_unpack_subtitles()
 
@@ -416,10 +510,9 @@ async def upload(  # pylint: disable=too-many-branches,too-many-arguments,too-ma
     vidfiles: list[str] = []
     vidfiles.append(final_path)
     if do_encode:
-        base_path = os.path.dirname(final_path)
         for height in HEIGHTS:
             if native_size != height and height < native_size:
-                outpath = os.path.join(base_path, f"{height}.mp4")
+                outpath = os.path.join(video_dir, f"{height}.mp4")
                 vidfiles.append(outpath)
                 await async_encode(
                     videopath=final_path,
@@ -506,8 +599,9 @@ def upload_url(  # pylint: disable=too-many-statements
             log.warning(
                 "No height found for video, downloading temporary video and querying height"
             )
-            # make a random name for the video
-            tmp_video_file = os.path.join(video_dir, f"{random.randint(0, 10000000000)}.mp4")
+            # make a unique name for the video
+            tmp_name = f"tmp_{os.getpid()}_{next(tmp_file_counter)}_{time.time_ns():x}.mp4"
+            tmp_video_file = os.path.join(video_dir, tmp_name)
             # Fallback behavior downloads the best video and audio and merges them, if necessary.
             cmd = f'yt-dlp -f "bv*[ext=mp4]+ba/b" {url} -o {tmp_video_file}'
             log.info("Running command:\n  %s", cmd)
@@ -583,18 +677,16 @@ def upload_url(  # pylint: disable=too-many-statements
     relpath = os.path.relpath(final_path, WWW_ROOT)
     url = path_to_url(os.path.dirname(relpath))
     thumbnail_ext = os.path.splitext(thumbnail)[1]
+    out_thumbnail = os.path.join(video_dir, "thumbnail.jpg")
     with TemporaryDirectory() as tmpdir:
         tmpfile = os.path.join(tmpdir, f"thumbnail{thumbnail_ext}")
         download_file(thumbnail, tmpfile)
         if thumbnail_ext != ".jpg":
             # convert to jpg
-            img = Image.open(tmpfile)
-            img.save(os.path.join(tmpdir, "thumbnail.jpg"), "JPEG")
-            shutil.copy(
-                os.path.join(tmpdir, "thumbnail.jpg"), os.path.join(video_dir, "thumbnail.jpg")
-            )
+            with Image.open(tmpfile) as img:
+                img.save(out_thumbnail, "JPEG")
         else:
-            shutil.copy(tmpfile, os.path.join(video_dir, "thumbnail.jpg"))
+            shutil.copy(tmpfile, out_thumbnail)
 
     vid_id = Video.create(
         title=title,
@@ -653,7 +745,7 @@ async def log_file(request: Request):
     """Returns the log file."""
     # authorize
     if not is_authorized(request):
-        return JSONResponse({"error": "Not Authorized"}, status_code=401)
+        return OrjsonResponse({"error": "Not Authorized"}, status_code=401)
     logfile = open(LOGFILE, encoding="utf-8", mode="r")  # pylint: disable=consider-using-with
     return StreamingResponse(logfile, media_type="text/plain")
 
@@ -0,0 +1,85 @@
+"""
+App state loaded once into memory from a json file.
+"""
+
+import json
+import os
+import sqlite3
+from contextlib import AbstractContextManager, nullcontext
+
+from video_server.io import read_utf8, write_utf8
+from video_server.log import log
+
+# Table that keyvalue_sqlite used for the app state in the legacy database.
+LEGACY_TABLE = "app"
+
+
+def read_legacy_state(db_path: str) -> dict:
+    """Reads the app state from the keyvalue_sqlite table used previously."""
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(f"SELECT key, value FROM {LEGACY_TABLE}").fetchall()
+    finally:
+        conn.close()
+    return {key: json.loads(value) for key, value in rows}
+
+
+class AppState:
+    """
+    Read only view of the app state shown by /info. Nothing in the server
+    writes the state at runtime, so it is loaded once and served from memory.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        legacy_db: str | None = None,
+        lock: AbstractContextManager | None = None,
+    ) -> None:
+        """The lock is held while migrating so that only one worker does it."""
+        self.path = path
+        self._data: dict = self._load(legacy_db, lock or nullcontext())
+
+    def _load(self, legacy_db: str | None, lock: AbstractContextManager) -> dict:
+        data = self._read()
+        if data is not None:
+            return data
+        with lock:
+            # Another process may have migrated while we waited on the lock.
+            data = self._read()
+            if data is not None:
+                return data
+            return self._migrate(legacy_db)
+
+    def _read(self) -> dict | None:
+        """Reads the state file, returns None when it doesn't exist."""
+        try:
+            data = json.loads(read_utf8(self.path))
+        except FileNotFoundError:
+            return None
+        except json.JSONDecodeError as exc:
+            log.error("Could not parse %s, starting with empty state: %s", self.path, exc)
+            return {}
+        if not isinstance(data, dict):
+            log.error("Expected a json object in %s, starting with empty state", self.path)
+            return {}
+        return data
+
+    def _migrate(self, legacy_db: str | None) -> dict:
+        """One time import of the state stored in the legacy sqlite database."""
+        if legacy_db is None or not os.path.exists(legacy_db):
+            return {}
+        try:
+            data = read_legacy_state(legacy_db)
+        except (sqlite3.Error, ValueError) as exc:
+            log.error("Could not read legacy app state from %s: %s", legacy_db, exc)
+            return {}
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        write_utf8(tmp_path, json.dumps(data))
+        os.replace(tmp_path, self.path)
+        log.info("Migrated app state from %s to %s", legacy_db, self.path)
+        return data
+
+    def to_dict(self) -> dict:
+        """Returns a copy of all the keys and values."""
+        return dict(self._data)
@@ -2,51 +2,35 @@
 Input output.
 """
 
+import re
+from functools import lru_cache
+from pathlib import Path
+
 from pathvalidate import sanitize_filepath
 
+# Characters that are replaced with an underscore by sanitize_path.
+_SPECIALS = " /\\.-,:;()[]{}<>?!@#$%^&*+=|~`'\"\t\n\r"
+_SANITIZE_TABLE = str.maketrans({ch: "_" for ch in _SPECIALS})
+# Replaces runs of specials and underscores with a single underscore.
+_SANITIZE_RE = re.compile("[" + re.escape(_SPECIALS + "_") + "]+")
+# Names made of ascii words joined by single underscores are already clean.
+# Short names are excluded since they could be reserved (e.g. "CON").
+_CLEAN_NAME = re.compile(r"[A-Za-z0-9]+(?:_[A-Za-z0-9]+)*", re.ASCII)
+_CLEAN_NAME_MAX_LEN = 255
+
 
+@lru_cache(maxsize=1024)
 def sanitize_path(path: str) -> str:
     """Sanitizes a path."""
-    # Generated by ai.
-    out = (
-        str(sanitize_filepath(path))  # type: ignore
-        .replace(" ", "_")
-        .replace("/", "_")
-        .replace("\\", "_")
-        .replace(".", "_")
-        .replace("-", "_")
-        .replace(",", "_")
-        .replace(":", "_")
-        .replace(";", "_")
-        .replace("(", "_")
-        .replace(")", "_")
-        .replace("[", "_")
-        .replace("]", "_")
-        .replace("{", "_")
-        .replace("}", "_")
-        .replace("<", "_")
-        .replace(">", "_")
-        .replace("?", "_")
-        .replace("!", "_")
-        .replace("@", "_")
-        .replace("#", "_")
-        .replace("$", "_")
-        .replace("%", "_")
-        .replace("^", "_")
-        .replace("&", "_")
-        .replace("*", "_")
-        .replace("+", "_")
-        .replace("=", "_")
-        .replace("|", "_")
-        .replace("~", "_")
-        .replace("`", "_")
-        .replace("'", "_")
-        .replace('"', "_")
-        .replace(" ", "_")
-        .replace("\t", "_")
-        .replace("\n", "_")
-        .replace("\r", "_")
-    )
+    if 4 < len(path) <= _CLEAN_NAME_MAX_LEN and _CLEAN_NAME.fullmatch(path):
+        return path
+    sanitized: str = sanitize_filepath(path)  # type: ignore
+    out = _SANITIZE_RE.sub("_", sanitized).rstrip("_")
+    if len(out) > 4:
+        return out
+    # Short names keep the original trimming rules so that they still map to
+    # the same directory as before.
+    out = sanitized.translate(_SANITIZE_TABLE)
     while len(out) > 4 and out[-1] == "_":
         out = out[:-1]
     while len(out) > 4 and "__" in out:
@@ -56,11 +40,9 @@ def sanitize_path(path: str) -> str:
 
 def read_utf8(file: str) -> str:
     """Reads a file and returns its contents as a string."""
-    with open(file, encoding="utf-8", mode="r") as f:  # pylint: disable=invalid-name
-        return f.read()
+    return Path(file).read_text(encoding="utf-8")
 
 
 def write_utf8(file: str, contents: str) -> None:
     """Writes a string to a file."""
-    with open(file, encoding="utf-8", mode="w") as f:  # pylint: disable=invalid-name
-        f.write(contents)
+    Path(file).write_text(contents, encoding="utf-8")
@@ -2,9 +2,12 @@
 Instantiates a logging object that can be used to log messages to the console and to a file.
 """
 
+import atexit
 import sys
 import logging
 import os
+import queue
+import threading
 
 from filelock import FileLock, Timeout
 from video_server.settings import LOGFILE, LOGFILELOCK
@@ -38,17 +41,90 @@ ERROR = logging.ERROR
 CRITICAL = logging.CRITICAL
 
 
+# Messages waiting to be appended to the log file by the writer thread. The
+# queue is bounded so a stuck disk can't grow memory without limit, messages
+# that don't fit are counted and reported once there is room again.
+LOG_QUEUE_MAXSIZE = 10000
+LOG_QUEUE: "queue.Queue[str | None]" = queue.Queue(maxsize=LOG_QUEUE_MAXSIZE)
+LOG_WRITE_LOCK_TIMEOUT = 10  # seconds, the write is retried after this
+_STOP = None  # Sentinel that tells the writer thread to exit.
+_DROPPED_LOCK = threading.Lock()
+_dropped_messages = 0  # pylint: disable=invalid-name
+_log_writer: threading.Thread | None = None  # pylint: disable=invalid-name
+
+
+def _drain_log_queue(batch: list) -> list:
+    """Moves all pending messages into batch without blocking."""
+    while True:
+        try:
+            batch.append(LOG_QUEUE.get_nowait())
+        except queue.Empty:
+            return batch
+
+
+def _take_dropped_count() -> int:
+    """Returns the number of dropped messages and resets the count."""
+    global _dropped_messages  # pylint: disable=global-statement,invalid-name
+    with _DROPPED_LOCK:
+        dropped, _dropped_messages = _dropped_messages, 0
+    return dropped
+
+
+def _log_writer_loop() -> None:
+    """Appends queued messages to the log file, one write per batch."""
+    while True:
+        batch = _drain_log_queue([LOG_QUEUE.get()])
+        messages = [msg for msg in batch if msg is not _STOP]
+        dropped = _take_dropped_count()
+        if dropped:
+            messages.append(f"{dropped} log messages dropped, the log queue was full\n")
+        if messages:
+            try:
+                _log_file_write("".join(messages))
+            except Exception as exc:  # pylint: disable=broad-except
+                sys.stderr.write(f"Could not write to log file {LOGFILE}: {exc!r}\n")
+        if _STOP in batch:
+            return
+
+
+@atexit.register
+def _stop_log_writer() -> None:
+    """Lets the writer thread finish the queued messages at exit."""
+    if _log_writer is None or not _log_writer.is_alive():
+        return
+    try:
+        LOG_QUEUE.put(_STOP, timeout=1)
+    except queue.Full:
+        return
+    _log_writer.join(timeout=5)
+
+
 def log_write_impl(message: str) -> None:
     """Write a log message."""
+    global _dropped_messages  # pylint: disable=global-statement,invalid-name
     sys.stdout.write(message)
     try:
-        with LOG_FILE_MUTEX.acquire(timeout=0.1):
-            with open(LOGFILE, encoding="utf-8", mode="a") as log_file:
-                log_file.write(message)
-    except Timeout:
-        sys.stderr.write(
-            "Could not acquire lock on log file for write, message:\n{message}\n"
-        )
+        LOG_QUEUE.put_nowait(message)
+    except queue.Full:
+        with _DROPPED_LOCK:
+            _dropped_messages += 1
+
+
+def _log_file_write(message: str) -> None:
+    """Append the message to the log file, truncating it when too large."""
+    # This runs on the writer thread so it waits for the lock rather than
+    # dropping the batch.
+    while True:
+        try:
+            with LOG_FILE_MUTEX.acquire(timeout=LOG_WRITE_LOCK_TIMEOUT):
+                with open(LOGFILE, encoding="utf-8", mode="a") as log_file:
+                    log_file.write(message)
+            break
+        except Timeout:
+            sys.stderr.write(
+                f"Could not acquire lock on log file for write after "
+                f"{LOG_WRITE_LOCK_TIMEOUT}s, retrying, message:\n{message}\n"
+            )
     try:
         # truncate the file if it is larger than 256k
         if os.path.getsize(LOGFILE) > 1024 * 256:
@@ -86,6 +162,9 @@ def _create_logger() -> logging.Logger:
     """Create a logger with the given name."""
     # create logger with 'spam_application'
     _log_init()
+    global _log_writer  # pylint: disable=global-statement,invalid-name
+    _log_writer = threading.Thread(target=_log_writer_loop, name="log-writer", daemon=True)
+    _log_writer.start()
     out = logging.getLogger("system")
     out.setLevel(DEBUG)
     # create console handler with a higher log level
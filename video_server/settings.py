@@ -23,7 +23,8 @@ PROJECT_ROOT = os.path.dirname(HERE)
 DATA_ROOT: str = os.environ.get("DATA_ROOT", os.path.join(PROJECT_ROOT, "var", "data"))
 WWW_ROOT = os.path.join(DATA_ROOT, "www")
 VIDEO_ROOT = os.path.join(WWW_ROOT, "v")
-APP_DB = os.path.join(DATA_ROOT, "app.sqlite")
+APP_STATE_FILE = os.path.join(DATA_ROOT, "app_state.json")
+APP_DB = os.path.join(DATA_ROOT, "app.sqlite")  # Legacy app state, see app_state.py
 LOGFILE = os.path.join(DATA_ROOT, "log.txt")
 
 for mydir in [DATA_ROOT, WWW_ROOT, VIDEO_ROOT]:
@@ -37,7 +38,6 @@ NUMBER_OF_ENCODING_THREADS: int = int(os.environ.get("NUMBER_OF_THREADS", 4))
 ENCODER_PRESET = os.environ.get("ENCODER_PRESET", "veryslow")
 IS_TEST = os.environ.get("IS_TEST", "0") == "1"
 STARTUP_LOCK = os.path.join(DATA_ROOT, "startup.lock")
-LOGFILE = os.path.join(DATA_ROOT, "log.txt")
 LOGFILELOCK = os.path.join(DATA_ROOT, "log.txt.lock")
 MAX_BAD_LOGINS_RESET_TIME = 60 * 10  # 10 minutes
 MAX_BAD_LOGINS = 10
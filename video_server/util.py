@@ -9,6 +9,7 @@ import urllib.parse
 from tempfile import TemporaryDirectory
 from typing import Tuple, Callable
 
+import aiofiles  # type: ignore
 import requests  # type: ignore
 from PIL import Image  # type: ignore
 
@@ -17,7 +18,8 @@ from video_server.settings import SERVER_PORT, ENCODER_PRESET, ENCODING_CRF
 from video_server.log import log
 from video_server.asyncwrap import asyncwrap
 
-CHUNK_SIZE = 1024 * 64
+CHUNK_SIZE = 1024 * 1024
+WRITE_BUFFER_SIZE = 8 * 1024 * 1024
 
 
 def get_video_url(url: str) -> str:
@@ -35,9 +37,20 @@ def get_video_url(url: str) -> str:
 
 async def async_download(src: UploadFile, dst: str) -> None:
     """Downloads a file to the destination."""
-    with open(dst, mode="wb") as filed:
+    # Accumulate chunks into one reusable buffer so the disk sees fewer,
+    # larger writes. The buffer is fixed size since uploads can be huge.
+    buf = bytearray(WRITE_BUFFER_SIZE)
+    view = memoryview(buf)
+    pos = 0
+    async with aiofiles.open(dst, mode="wb") as filed:
         while (chunk := await src.read(CHUNK_SIZE)) != b"":
-            filed.write(chunk)
+            if pos + len(chunk) > WRITE_BUFFER_SIZE:
+                await filed.write(view[:pos])
+                pos = 0
+            view[pos : pos + len(chunk)] = chunk
+            pos += len(chunk)
+        if pos:
+            await filed.write(view[:pos])
     await src.close()
 
 
@@ -110,6 +123,13 @@ def async_encode(videopath: str, crf: int, height: int, outpath: str) -> None:
     encode(videopath, crf, height, outpath)
 
 
+def parse_height_line(line: str) -> int | None:
+    """Returns the height from a "height=N" line of ffprobe -show_streams."""
+    if line.startswith("height"):
+        return int(line.split("=")[1])
+    return None
+
+
 def get_video_height(vidfile: str) -> int:
     """Gets the video height from the video file."""
     # use ffprobe to get the height of the video
@@ -118,16 +138,43 @@ def get_video_height(vidfile: str) -> int:
     stdout = subprocess.check_output(cmd, shell=True)
     lines = stdout.decode().splitlines()
     for line in lines:
-        if line.startswith("height"):
-            height = int(line.split("=")[1])
+        height = parse_height_line(line)
+        if height is not None:
             return height
     raise ValueError(f"Missing height in {vidfile}")
 
 
-@asyncwrap
-def async_get_video_height(vidfile: str) -> int:
+async def async_get_video_height(vidfile: str) -> int:
     """Async version of get_video_height."""
-    return get_video_height(vidfile)
+    assert os.path.exists(vidfile)
+    cmd = ["static_ffprobe", vidfile, "-show_streams"]
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+    )
+    assert proc.stdout is not None
+    output: list[bytes] = []
+    height: int | None = None
+    try:
+        while line := await proc.stdout.readline():
+            height = parse_height_line(line.decode().rstrip())
+            if height is not None:
+                break
+            output.append(line)
+        # Discard the rest of the output in large blocks and reap the process.
+        while await proc.stdout.read(64 * 1024):
+            pass
+        await proc.wait()
+    finally:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, output=b"".join(output))
+    if height is None:
+        raise ValueError(f"Missing height in {vidfile}")
+    return height
 
 
 def mktorrent(